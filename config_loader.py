@@ -4,10 +4,27 @@ Loads configuration from config.json file with fallback to environment variables
 """
 
 import os
-import json
+from functools import cached_property
 from typing import Dict, Any, Optional
 from pathlib import Path
 
+import orjson
+
+# Environment variable -> (config section, key, value converter)
+_ENV_OVERRIDES = (
+    # GCP settings
+    ("GCP_PROJECT_ID", "gcp", "project_id", str),
+    ("BIGQUERY_DATASET", "gcp", "dataset_id", str),
+    ("BIGQUERY_TABLE", "gcp", "table_id", str),
+    ("GOOGLE_APPLICATION_CREDENTIALS", "gcp", "credentials_file", str),
+    # API settings
+    ("PREDICT_API_URL", "api", "predict_api_url", str),
+    # Weather settings
+    ("WEATHER_LAT", "weather", "latitude", float),
+    ("WEATHER_LON", "weather", "longitude", float),
+    ("WEATHER_CITY", "weather", "city", str),
+)
+
 
 class Config:
     """Configuration manager for the project."""
@@ -26,8 +43,15 @@ class Config:
             config_file = Path(config_file)
         
         self.config_file = config_file
-        self._config: Dict[str, Any] = {}
-        self._load_config()
+        # Loaded lazily on first access so importing modules stays cheap
+        self._config: Optional[Dict[str, Any]] = None
+    
+    @property
+    def config(self) -> Dict[str, Any]:
+        """Get the merged configuration, loading it on first access."""
+        if self._config is None:
+            self._load_config()
+        return self._config
     
     def _load_config(self) -> None:
         """Load configuration from file or use defaults with environment variable overrides."""
@@ -49,7 +73,7 @@ class Config:
                 "city": "Danang"
             },
             "model": {
-                "model_file": "weather_model.pkl"
+                "model_file": "weather_model.npy"
             },
             "app": {
                 "show_debug_info": False
@@ -59,11 +83,10 @@ class Config:
         # Try to load from config file
         if self.config_file.exists():
             try:
-                with open(self.config_file, 'r') as f:
-                    file_config = json.load(f)
-                    # Merge with defaults (file config takes precedence)
-                    self._config = self._deep_merge(defaults, file_config)
-            except (json.JSONDecodeError, IOError) as e:
+                file_config = orjson.loads(self.config_file.read_bytes())
+                # Merge with defaults (file config takes precedence)
+                self._config = self._deep_merge(defaults, file_config)
+            except (orjson.JSONDecodeError, IOError) as e:
                 print(f"Warning: Could not load config file {self.config_file}: {e}")
                 print("Using defaults with environment variable overrides.")
                 self._config = defaults
@@ -76,38 +99,25 @@ class Config:
         self._apply_env_overrides()
     
     def _deep_merge(self, base: Dict, override: Dict) -> Dict:
-        """Deep merge two dictionaries."""
-        result = base.copy()
-        for key, value in override.items():
-            if key in result and isinstance(result[key], dict) and isinstance(value, dict):
-                result[key] = self._deep_merge(result[key], value)
-            else:
-                result[key] = value
-        return result
+        """Deep merge override into base (in place) and return base."""
+        stack = [(base, override)]
+        while stack:
+            target, source = stack.pop()
+            for key, value in source.items():
+                current = target.get(key)
+                if isinstance(current, dict) and isinstance(value, dict):
+                    stack.append((current, value))
+                else:
+                    target[key] = value
+        return base
     
     def _apply_env_overrides(self) -> None:
         """Apply environment variable overrides to configuration."""
-        # GCP settings
-        if os.getenv("GCP_PROJECT_ID"):
-            self._config["gcp"]["project_id"] = os.getenv("GCP_PROJECT_ID")
-        if os.getenv("BIGQUERY_DATASET"):
-            self._config["gcp"]["dataset_id"] = os.getenv("BIGQUERY_DATASET")
-        if os.getenv("BIGQUERY_TABLE"):
-            self._config["gcp"]["table_id"] = os.getenv("BIGQUERY_TABLE")
-        if os.getenv("GOOGLE_APPLICATION_CREDENTIALS"):
-            self._config["gcp"]["credentials_file"] = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
-        
-        # API settings
-        if os.getenv("PREDICT_API_URL"):
-            self._config["api"]["predict_api_url"] = os.getenv("PREDICT_API_URL")
-        
-        # Weather settings
-        if os.getenv("WEATHER_LAT"):
-            self._config["weather"]["latitude"] = float(os.getenv("WEATHER_LAT"))
-        if os.getenv("WEATHER_LON"):
-            self._config["weather"]["longitude"] = float(os.getenv("WEATHER_LON"))
-        if os.getenv("WEATHER_CITY"):
-            self._config["weather"]["city"] = os.getenv("WEATHER_CITY")
+        env = os.environ
+        for env_name, section, key, convert in _ENV_OVERRIDES:
+            value = env.get(env_name)
+            if value:
+                self._config[section][key] = convert(value)
     
     def get(self, *keys, default: Any = None) -> Any:
         """
@@ -120,7 +130,7 @@ class Config:
         Returns:
             Configuration value or default
         """
-        value = self._config
+        value = self.config
         for key in keys:
             if isinstance(value, dict):
                 value = value.get(key)
@@ -130,27 +140,29 @@ class Config:
                 return default
         return value
     
-    @property
+    # Derived settings are resolved once on first access and then stored on the
+    # instance, so repeated reads are plain attribute lookups.
+    @cached_property
     def gcp_project_id(self) -> str:
         """Get GCP project ID."""
         return self.get("gcp", "project_id")
     
-    @property
+    @cached_property
     def gcp_dataset_id(self) -> str:
         """Get BigQuery dataset ID."""
         return self.get("gcp", "dataset_id")
     
-    @property
+    @cached_property
     def gcp_table_id(self) -> str:
         """Get BigQuery table ID."""
         return self.get("gcp", "table_id")
     
-    @property
+    @cached_property
     def gcp_full_table_path(self) -> str:
         """Get full BigQuery table path."""
         return f"{self.gcp_project_id}.{self.gcp_dataset_id}.{self.gcp_table_id}"
     
-    @property
+    @cached_property
     def gcp_credentials_file(self) -> str:
         """Get GCP credentials file path."""
         cred_file = self.get("gcp", "credentials_file")
@@ -159,32 +171,32 @@ class Config:
             cred_file = str(self.config_file.parent / cred_file)
         return cred_file
     
-    @property
+    @cached_property
     def api_base_url(self) -> str:
         """Get API base URL."""
         return self.get("api", "predict_api_url")
     
-    @property
+    @cached_property
     def api_timeout(self) -> int:
         """Get API timeout in seconds."""
         return self.get("api", "timeout", default=5)
     
-    @property
+    @cached_property
     def weather_latitude(self) -> float:
         """Get weather location latitude."""
         return self.get("weather", "latitude")
     
-    @property
+    @cached_property
     def weather_longitude(self) -> float:
         """Get weather location longitude."""
         return self.get("weather", "longitude")
     
-    @property
+    @cached_property
     def weather_city(self) -> str:
         """Get weather city name."""
         return self.get("weather", "city")
     
-    @property
+    @cached_property
     def model_file(self) -> str:
         """Get model file path."""
         model_file = self.get("model", "model_file")
@@ -193,7 +205,7 @@ class Config:
             model_file = str(self.config_file.parent / model_file)
         return model_file
     
-    @property
+    @cached_property
     def show_debug_info(self) -> bool:
         """Get whether to show debug info in the app."""
         return self.get("app", "show_debug_info", default=False)
@@ -1,4 +1,9 @@
-from fastapi import FastAPI
+import asyncio
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import FastAPI, Query
+from pydantic import BaseModel
 
 import predict_only as po
 
@@ -6,12 +11,29 @@ import predict_only as po
 app = FastAPI()
 
 
-@app.get("/data")
-def get_latest_data(limit: int = 500):
+class WeatherRow(BaseModel):
+    timestamp: datetime
+    temperature: Optional[float] = None
+    humidity: Optional[float] = None
+    wind_speed: Optional[float] = None
+
+
+class DataResponse(BaseModel):
+    status: str
+    message: Optional[str] = None
+    row_count: Optional[int] = None
+    rows: List[WeatherRow] = []
+
+
+# The response model lets FastAPI serialize straight to JSON bytes with
+# Pydantic instead of jsonable_encoder + stdlib json; unset fields are omitted
+@app.get("/data", response_model=DataResponse, response_model_exclude_unset=True)
+async def get_latest_data(limit: int = Query(500, ge=1, le=5000)):
     """
     Return recent rows from BigQuery for display clients (e.g. Streamlit).
     """
-    df_raw = po.load_latest_data(limit=limit)
+    # BigQuery I/O runs in a worker thread so the event loop stays free
+    df_raw = await asyncio.to_thread(po.load_latest_data, limit=limit)
     if df_raw.empty:
         return {
             "status": "error",
@@ -19,7 +41,7 @@ def get_latest_data(limit: int = 500):
             "rows": [],
         }
 
-    # Convert to JSON-serializable list of dicts
+    # Plain dicts; the response model handles Timestamp/float serialization
     rows = df_raw.to_dict(orient="records")
     return {
         "status": "success",
@@ -28,33 +50,37 @@ def get_latest_data(limit: int = 500):
     }
 
 
+@app.post("/refresh")
+async def refresh():
+    """
+    Drop cached BigQuery results so the next /data or /predict call reads fresh rows.
+    """
+    po.clear_cache()
+    return {"status": "success"}
+
+
 @app.get("/predict")
-def get_prediction():
+async def get_prediction():
     """
     Predict the next temperature using the persisted model and latest BigQuery data.
 
     Relies on:
       - BigQuery table: ai-realtime-project.sensor_data_stream.real-weather
-      - Persisted model file: weather_model.pkl (created by train_model.py)
+      - Persisted model file: weather_model.npy (created by train_model.py)
     """
-    # 1. Load the latest data from BigQuery
-    df_raw = po.load_latest_data()
-    if df_raw.empty:
+    # Load, feature engineering and prediction run in a single worker thread
+    # so the event loop stays free and the request makes only one hop
+    current_temp, prediction, status = await asyncio.to_thread(po.predict_latest)
+
+    if status == "no_rows":
         return {
             "status": "error",
             "message": "No data found in BigQuery table. Start your real-time streamer first.",
         }
-
-    # 2. Apply the same feature engineering as training/Streamlit
-    df_feat, df_clean = po.engineer_features(df_raw)
-
-    # 3. Use the persisted model to predict the next temperature
-    current_temp, prediction, status = po.predict_next_temperature(df_feat, df_clean)
-
     if status == "no_model":
         return {
             "status": "error",
-            "message": "Trained model file 'weather_model.pkl' not found. Run 'python train_model.py' first.",
+            "message": "Trained model file 'weather_model.npy' not found. Run 'python train_model.py' first.",
         }
     if status == "no_data":
         return {
@@ -67,7 +93,7 @@ def get_prediction():
             "message": "Unable to generate prediction. Check recent data and the trained model file.",
         }
 
-    # 4. Return the result as JSON (structure similar to earlier example)
+    # Return the result as JSON (structure similar to earlier example)
     return {
         "status": "success",
         "current_weather": {
@@ -1,8 +1,12 @@
 import os
-from typing import Tuple, Optional
+import threading
+from functools import lru_cache
+from typing import Dict, Tuple, Optional
 
+import numpy as np
 import pandas as pd
-from google.cloud import bigquery
+from cachetools import TTLCache
+from google.cloud import bigquery, bigquery_storage
 
 import train_model as tm
 from config_loader import get_config
@@ -22,6 +26,97 @@ else:
 
 FULL_TABLE_PATH = config.gcp_full_table_path
 
+# Take the newest @n rows, then let BigQuery return them oldest to newest.
+# The SQL text is constant so BigQuery can serve repeats from its result cache.
+_LATEST_ROWS_QUERY = f"""
+    SELECT * FROM (
+        SELECT timestamp, temperature, humidity, wind_speed 
+        FROM `{FULL_TABLE_PATH}`
+        ORDER BY timestamp DESC
+        LIMIT @n
+    )
+    ORDER BY timestamp ASC
+"""
+
+# Results larger than this are downloaded through the BigQuery Storage Read API
+# (well below the /data cap, while the dashboard's 500-row reads stay on REST)
+STORAGE_API_MIN_ROWS = 1000
+
+# BigQuery clients, created lazily on first use and reused across requests
+_BQ_CLIENT: Optional[bigquery.Client] = None
+_BQ_STORAGE_CLIENT: Optional[bigquery_storage.BigQueryReadClient] = None
+_BQ_CLIENT_LOCK = threading.Lock()
+
+
+def _get_client() -> bigquery.Client:
+    """Return the shared BigQuery client, creating it on first call."""
+    global _BQ_CLIENT
+    if _BQ_CLIENT is None:
+        with _BQ_CLIENT_LOCK:
+            if _BQ_CLIENT is None:
+                _BQ_CLIENT = bigquery.Client()
+    return _BQ_CLIENT
+
+
+def _get_storage_client() -> bigquery_storage.BigQueryReadClient:
+    """Return the shared BigQuery Storage read client, creating it on first call."""
+    global _BQ_STORAGE_CLIENT
+    if _BQ_STORAGE_CLIENT is None:
+        with _BQ_CLIENT_LOCK:
+            if _BQ_STORAGE_CLIENT is None:
+                _BQ_STORAGE_CLIENT = bigquery_storage.BigQueryReadClient()
+    return _BQ_STORAGE_CLIENT
+
+
+# Recent query results (Arrow tables keyed by limit), shared by all request threads
+# so concurrent /data and /predict calls don't each run the same BigQuery job
+_RESULT_CACHE: TTLCache = TTLCache(maxsize=32, ttl=60)
+_RESULT_CACHE_LOCK = threading.RLock()
+# One lock per limit: the first thread to miss runs the query, the others wait for it
+_FETCH_LOCKS: Dict[int, threading.Lock] = {}
+
+
+def clear_cache() -> None:
+    """Drop cached query results so the next load hits BigQuery."""
+    with _RESULT_CACHE_LOCK:
+        _RESULT_CACHE.clear()
+
+
+@lru_cache(maxsize=8)
+def _latest_rows_job_config(limit: int) -> bigquery.QueryJobConfig:
+    """Build (once per limit) the job config binding the @n query parameter."""
+    return bigquery.QueryJobConfig(
+        query_parameters=[bigquery.ScalarQueryParameter("n", "INT64", limit)]
+    )
+
+
+def _fetch_latest_rows(limit: int):
+    """Run the latest-rows query once per limit, even when many threads miss together."""
+    with _RESULT_CACHE_LOCK:
+        fetch_lock = _FETCH_LOCKS.setdefault(limit, threading.Lock())
+
+    with fetch_lock:
+        # Another thread may have filled the cache while we waited
+        with _RESULT_CACHE_LOCK:
+            table = _RESULT_CACHE.get(limit)
+        if table is not None:
+            return table
+
+        client = _get_client()
+
+        # Execute query as Arrow
+        query_job = client.query(_LATEST_ROWS_QUERY, job_config=_latest_rows_job_config(limit))
+        if limit >= STORAGE_API_MIN_ROWS:
+            # Large reads: stream Arrow record batches over gRPC
+            table = query_job.to_arrow(bqstorage_client=_get_storage_client())
+        else:
+            # Small reads fit in the first REST page; skip Storage API setup
+            table = query_job.to_arrow(create_bqstorage_client=False)
+
+        with _RESULT_CACHE_LOCK:
+            _RESULT_CACHE[limit] = table
+        return table
+
 
 def load_latest_data(limit: int = 500) -> pd.DataFrame:
     """
@@ -35,24 +130,15 @@ def load_latest_data(limit: int = 500) -> pd.DataFrame:
         Returns empty DataFrame if query fails or no data found.
     """
     try:
-        client = bigquery.Client()
-
-        query = f"""
-            SELECT timestamp, temperature, humidity, wind_speed 
-            FROM `{FULL_TABLE_PATH}`
-            ORDER BY timestamp DESC
-            LIMIT {limit}
-        """
-        
-        # Execute query and convert to pandas
-        query_job = client.query(query)
-        df = query_job.to_dataframe()
-        
-        # Reverse to get chronological order (oldest to newest)
-        if not df.empty:
-            df = df.sort_values('timestamp').reset_index(drop=True)
+        with _RESULT_CACHE_LOCK:
+            table = _RESULT_CACHE.get(limit)
+
+        if table is None:
+            table = _fetch_latest_rows(limit)
         
-        return df
+        # Every caller gets its own DataFrame (engineer_features mutates it);
+        # split_blocks hands the column buffers over without consolidating them
+        return table.to_pandas(split_blocks=True)
         
     except Exception as e:
         print(f"❌ Error loading data from BigQuery: {e}")
@@ -61,20 +147,32 @@ def load_latest_data(limit: int = 500) -> pd.DataFrame:
 
 
 def engineer_features(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
-    """Apply feature engineering and create target_temp column."""
+    """
+    Apply feature engineering and create target_temp column.
+
+    The input DataFrame is modified in place (feature columns are added to it);
+    pass a copy if the original must be preserved.
+    """
     if df.empty:
         return df, df
 
-    df = df.copy()
     df["timestamp"] = pd.to_datetime(df["timestamp"])
-    df["hour"] = df["timestamp"].dt.hour
-    df["day_of_week"] = df["timestamp"].dt.dayofweek
+
+    # Work on the raw datetime64 values (UTC) instead of the .dt accessors
+    ts = df["timestamp"].values.astype("datetime64[ns]")
+    df["hour"] = (ts.astype("datetime64[h]").astype(np.int64) % 24).astype(np.int8)
+    # 1970-01-01 was a Thursday (Monday=0 -> Thursday=3)
+    df["day_of_week"] = ((ts.astype("datetime64[D]").astype(np.int64) + 3) % 7).astype(np.int8)
 
     # Target: next temperature (next row)
-    df["target_temp"] = df["temperature"].shift(-1)
+    temperature = df["temperature"].to_numpy(dtype=np.float64)
+    target_temp = np.empty_like(temperature)
+    target_temp[:-1] = temperature[1:]
+    target_temp[-1] = np.nan
+    df["target_temp"] = target_temp
 
     # Clean rows with target
-    df_clean = df.dropna().copy()
+    df_clean = df.dropna()
     return df, df_clean
 
 
@@ -82,7 +180,7 @@ def predict_next_temperature(
     df: pd.DataFrame, df_clean: pd.DataFrame
 ) -> Tuple[Optional[float], Optional[float], str]:
     """
-    Use a persisted model (weather_model.pkl) to predict the next temperature.
+    Use a persisted model (weather_model.npy) to predict the next temperature.
 
     Returns (current_temp, predicted_temp, status) where status is one of:
       - "ok"
@@ -96,26 +194,39 @@ def predict_next_temperature(
     if model is None:
         return None, None, "no_model"
 
-    latest_now = df.tail(1)
-    pred = model.predict(latest_now[["temperature", "hour", "humidity"]])
-
-    current_temp = float(latest_now["temperature"].values[0])
-    predicted_temp = float(pred[0])
+    # Read the latest row's scalars directly rather than slicing a 1-row DataFrame
+    current_temp = float(df["temperature"].iat[-1])
+    features = np.array(
+        [[current_temp, df["hour"].iat[-1], df["humidity"].iat[-1]]], dtype=np.float32
+    )
+    predicted_temp = float(model.predict(features)[0])
     return current_temp, predicted_temp, "ok"
 
 
-if __name__ == "__main__":
-    print("📡 Loading latest data from BigQuery for prediction...")
-    df_raw = load_latest_data()
+def predict_latest(limit: int = 500) -> Tuple[Optional[float], Optional[float], str]:
+    """
+    Load the latest rows, engineer features and predict the next temperature.
+
+    Returns (current_temp, predicted_temp, status) like predict_next_temperature,
+    with the extra status "no_rows" when BigQuery returned nothing.
+    """
+    df_raw = load_latest_data(limit)
     if df_raw.empty:
-        print("⚠️ No data found in BigQuery table. Start your `real-weather.py` streamer first.")
-        raise SystemExit(1)
+        return None, None, "no_rows"
 
     df_feat, df_clean = engineer_features(df_raw)
-    current, pred, status = predict_next_temperature(df_feat, df_clean)
+    return predict_next_temperature(df_feat, df_clean)
+
 
+if __name__ == "__main__":
+    print("📡 Loading latest data from BigQuery for prediction...")
+    current, pred, status = predict_latest()
+
+    if status == "no_rows":
+        print("⚠️ No data found in BigQuery table. Start your `real-weather.py` streamer first.")
+        raise SystemExit(1)
     if status == "no_model":
-        print("⚠️ Trained model file `weather_model.pkl` not found. Run `python train_model.py` first.")
+        print("⚠️ Trained model file `weather_model.npy` not found. Run `python train_model.py` first.")
     elif status == "no_data":
         print("⚠️ Not enough clean data to predict. Keep the stream running to collect more points.")
     else:
@@ -6,12 +6,17 @@ Designed to run once per execution (suitable for cron).
 """
 
 import os
-import json
 import io
 import sys
-from datetime import datetime
+import threading
+from datetime import datetime, timezone
+from typing import Optional
+from google.api_core.exceptions import Forbidden
 from google.cloud import bigquery
 import requests
+from requests.adapters import HTTPAdapter
+
+import orjson
 
 from config_loader import get_config
 
@@ -41,35 +46,75 @@ LAT = config.weather_latitude
 LON = config.weather_longitude
 CITY = config.weather_city
 
+# Open-Meteo request (parameters are constant for the configured location)
+OPEN_METEO_URL = "https://api.open-meteo.com/v1/forecast"
+OPEN_METEO_PARAMS = {
+    "latitude": LAT,
+    "longitude": LON,
+    "current": "temperature_2m,relative_humidity_2m,wind_speed_10m",
+}
+
+# Load job settings never change between pushes (used when streaming is unavailable)
+LOAD_JOB_CONFIG = bigquery.LoadJobConfig(
+    source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
+    write_disposition="WRITE_APPEND",
+)
+
+# BigQuery client, created lazily on first use and reused afterwards
+_BQ_CLIENT: Optional[bigquery.Client] = None
+_BQ_CLIENT_LOCK = threading.Lock()
+
+
+def _get_client() -> bigquery.Client:
+    """Return the shared BigQuery client, creating it on first call."""
+    global _BQ_CLIENT
+    if _BQ_CLIENT is None:
+        with _BQ_CLIENT_LOCK:
+            if _BQ_CLIENT is None:
+                _BQ_CLIENT = bigquery.Client()
+    return _BQ_CLIENT
+
+
+# HTTP session so repeated fetches reuse the same keep-alive connection
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+_SESSION.headers.update({"Accept-Encoding": "gzip"})
+
 
 def fetch_weather():
     """Fetch current weather data from Open-Meteo API."""
-    url = f"https://api.open-meteo.com/v1/forecast?latitude={LAT}&longitude={LON}&current=temperature_2m,relative_humidity_2m,wind_speed_10m"
     try:
-        response = requests.get(url, timeout=10)
+        response = _SESSION.get(OPEN_METEO_URL, params=OPEN_METEO_PARAMS, timeout=10)
         response.raise_for_status()
-        data = response.json()['current']
-        return data
+        return orjson.loads(response.content)['current']
     except requests.exceptions.RequestException as e:
         print(f"❌ Error fetching weather data: {e}", file=sys.stderr)
         raise
 
 
+def _load_rows(rows):
+    """Upload rows with a batch load job (Free Sandbox Method)."""
+    json_data = b"".join(orjson.dumps(row) + b"\n" for row in rows)
+    file_obj = io.BytesIO(json_data)
+    
+    load_job = _get_client().load_table_from_file(file_obj, full_table_path, job_config=LOAD_JOB_CONFIG)
+    load_job.result()  # Wait for the job to complete
+
+
 def push_to_bigquery(row):
     """Push a single row to BigQuery."""
     try:
-        client = bigquery.Client()
-        
-        # Batch Upload (Free Sandbox Method)
-        json_data = json.dumps(row) + "\n"
-        file_obj = io.StringIO(json_data)
-        job_config = bigquery.LoadJobConfig(
-            source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
-            write_disposition="WRITE_APPEND",
-        )
+        client = _get_client()
         
-        load_job = client.load_table_from_file(file_obj, full_table_path, job_config=job_config)
-        load_job.result()  # Wait for the job to complete
+        # Streaming insert: no load job to create and poll for a single row
+        try:
+            errors = client.insert_rows_json(full_table_path, [row])
+        except Forbidden:
+            # Streaming is not allowed in the free sandbox, use a batch load instead
+            _load_rows([row])
+            return True
+        if errors:
+            raise RuntimeError(errors)
         
         return True
     except Exception as e:
@@ -87,17 +132,17 @@ def main():
         
         # 2. Structure the data
         row = {
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),  # insert_rows_json needs a string
             "city": CITY,
             "temperature": weather['temperature_2m'],
             "humidity": weather['relative_humidity_2m'],
-            "wind_speed": weather['wind_speed_10m']
+            "wind_speed": weather['wind_speed_10m'],
         }
         
         # 3. Push to BigQuery
         push_to_bigquery(row)
         
-        print(f"✅ Success: {weather['temperature_2m']}°C recorded at {row['timestamp']}")
+        print(f"✅ Success: {row['temperature']}°C recorded at {row['timestamp']}")
         return 0
         
     except Exception as e:
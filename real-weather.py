@@ -1,11 +1,14 @@
 import requests
-import time
+from requests.adapters import HTTPAdapter
 import os
-import json
 import io
-from datetime import datetime
+from datetime import datetime, timezone
+from apscheduler.schedulers.blocking import BlockingScheduler
+from apscheduler.triggers.interval import IntervalTrigger
 from google.cloud import bigquery
 
+import orjson
+
 # --- CONFIGURATION ---
 current_dir = os.path.dirname(os.path.abspath(__file__))
 KEY_FILE = os.path.join(current_dir, "ai-realtime-project-4de709b969f4.json")
@@ -21,23 +24,37 @@ client = bigquery.Client()
 
 # Set the Da Nang coordinates (or update to your current location)
 LAT, LON = 16.047079, 108.206230
+OPEN_METEO_URL = "https://api.open-meteo.com/v1/forecast"
+OPEN_METEO_PARAMS = {
+    "latitude": LAT,
+    "longitude": LON,
+    "current": "temperature_2m,relative_humidity_2m,wind_speed_10m",
+}
+
+# Keep-alive session reused across loop iterations
+session = requests.Session()
+session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+session.headers.update({"Accept-Encoding": "gzip"})
 
 def fetch_weather():
-    url = f"https://api.open-meteo.com/v1/forecast?latitude={LAT}&longitude={LON}&current=temperature_2m,relative_humidity_2m,wind_speed_10m"
-    response = requests.get(url)
-    data = response.json()['current']
-    return data
+    response = session.get(OPEN_METEO_URL, params=OPEN_METEO_PARAMS, timeout=10)
+    return orjson.loads(response.content)['current']
 
-print(f"📡 Starting REAL weather feed to {TABLE_ID}...")
+# Load job settings and upload buffer are reused on every tick
+job_config = bigquery.LoadJobConfig(
+    source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
+    write_disposition="WRITE_APPEND",
+)
+file_obj = io.BytesIO()
 
-try:
-    while True:
+def fetch_and_push():
+    try:
         # 1. Fetch from Real API
         weather = fetch_weather()
         
         # 2. Structure the data
         row = {
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": datetime.now(timezone.utc),
             "city": "Danang",
             "temperature": weather['temperature_2m'],
             "humidity": weather['relative_humidity_2m'],
@@ -45,20 +62,36 @@ try:
         }
         
         # 3. Batch Upload (Free Sandbox Method)
-        json_data = json.dumps(row) + "\n"
-        file_obj = io.StringIO(json_data)
-        job_config = bigquery.LoadJobConfig(
-            source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
-            write_disposition="WRITE_APPEND",
-        )
+        # The datetime is serialized straight to RFC 3339 by the encoder
+        json_data = orjson.dumps(row, option=orjson.OPT_UTC_Z) + b"\n"
+        file_obj.seek(0)
+        file_obj.truncate(0)
+        file_obj.write(json_data)
+        file_obj.seek(0)
         
         load_job = client.load_table_from_file(file_obj, full_table_path, job_config=job_config)
         load_job.result() 
         
         print(f"✅ Success: {weather['temperature_2m']}°C recorded at {row['timestamp']}")
-        
-        # Wait 5 minutes (Professional APIs appreciate a 300s delay)
-        time.sleep(300)
 
-except Exception as e:
-    print(f"❌ Error: {e}")
\ No newline at end of file
+    except Exception as e:
+        # Keep the scheduler alive; the next tick retries
+        print(f"❌ Error: {e}")
+
+print(f"📡 Starting REAL weather feed to {TABLE_ID}...")
+
+# Run every 5 minutes (Professional APIs appreciate a 300s delay), starting now.
+# Missed ticks are coalesced into one run instead of piling up.
+scheduler = BlockingScheduler()
+scheduler.add_job(
+    fetch_and_push,
+    IntervalTrigger(minutes=5),
+    next_run_time=datetime.now(),
+    max_instances=1,
+    coalesce=True,
+)
+
+try:
+    scheduler.start()
+except (KeyboardInterrupt, SystemExit):
+    print("\n🛑 Feed stopped.")
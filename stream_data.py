@@ -1,11 +1,12 @@
 import time
 import random
 import os
-import json
 import io
-from datetime import datetime
+from datetime import datetime, timezone
 from google.cloud import bigquery
 
+import orjson
+
 # --- CONFIGURATION ---
 # 1. Get the absolute path to the folder where THIS script is saved
 # This ensures the script finds the key even if you run it from a different folder
@@ -33,31 +34,57 @@ job_config = bigquery.LoadJobConfig(
     write_disposition="WRITE_APPEND",
 )
 
+# Rows are buffered and uploaded together: each load job has a fixed overhead
+FLUSH_MAX_ROWS = 60
+FLUSH_MAX_SECONDS = 300
+
+
+def flush(buf):
+    """Upload all buffered rows with a single load job and clear the buffer."""
+    if not buf:
+        return
+    
+    # Convert to 'Newline Delimited JSON' (BigQuery's favorite format)
+    # We use io.BytesIO to pretend we have a file in memory
+    # Timestamps are datetimes, serialized straight to RFC 3339 by the encoder
+    json_data = b"\n".join(orjson.dumps(r, option=orjson.OPT_UTC_Z) for r in buf) + b"\n"
+    file_obj = io.BytesIO(json_data)
+    
+    # Batch Upload (This is the FREE way)
+    load_job = client.load_table_from_file(
+        file_obj, full_table_path, job_config=job_config
+    )
+    
+    # Wait for the upload to finish
+    load_job.result() 
+    
+    print(f"✅ Batch Upload Success: {len(buf)} rows")
+    buf.clear()
+
+
 print(f"🚀 Sandbox-friendly stream starting to {full_table_path}...")
 
+buf = []
+last_flush = time.time()
+
 try:
     while True:
         # 1. Create the data
-        current_time = datetime.utcnow().isoformat()
+        current_time = datetime.now(timezone.utc)
         random_value = round(random.uniform(20.0, 100.0), 2)
         
         row = {"timestamp": current_time, "device_id": "macbook_sandbox", "value": random_value}
+        buf.append(row)
+        print(f"📝 Buffered: {random_value} ({len(buf)} pending)")
         
-        # 2. Convert to 'Newline Delimited JSON' (BigQuery's favorite format)
-        # We use io.StringIO to pretend we have a file in memory
-        json_data = json.dumps(row) + "\n"
-        file_obj = io.StringIO(json_data)
-        
-        # 3. Batch Upload (This is the FREE way)
-        load_job = client.load_table_from_file(
-            file_obj, full_table_path, job_config=job_config
-        )
-        
-        # Wait for the upload to finish
-        load_job.result() 
+        # 2. Upload once enough rows (or time) have accumulated
+        if len(buf) >= FLUSH_MAX_ROWS or time.time() - last_flush > FLUSH_MAX_SECONDS:
+            flush(buf)
+            last_flush = time.time()
         
-        print(f"✅ Batch Upload Success: {random_value}")
         time.sleep(5)
 
 except KeyboardInterrupt:
-    print("\n🛑 Stream stopped.")
\ No newline at end of file
+    # Don't drop the readings collected since the last upload
+    flush(buf)
+    print("\n🛑 Stream stopped.")
@@ -2,6 +2,10 @@ import os
 import pandas as pd
 import requests
 import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import orjson
 
 from config_loader import get_config
 
@@ -35,6 +39,48 @@ if not API_BASE_URL:
 
 API_TIMEOUT = config.api_timeout
 
+# Columns returned by the /data endpoint
+DATA_COLUMNS = ["timestamp", "temperature", "humidity", "wind_speed"]
+
+
+@st.cache_resource
+def get_session() -> requests.Session:
+    """HTTP session shared across reruns so API calls reuse keep-alive connections."""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=8,
+        max_retries=Retry(total=2, backoff_factor=0.2),
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def fetch_predict(base_url: str) -> dict:
+    """Call /predict and return the parsed JSON body (cached for 30s)."""
+    resp = get_session().get(f"{base_url}/predict", timeout=API_TIMEOUT)
+    resp.raise_for_status()
+    return orjson.loads(resp.content)
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def fetch_rows(base_url: str, limit: int) -> dict:
+    """Call /data and return the parsed JSON body (cached for 30s)."""
+    resp = get_session().get(f"{base_url}/data?limit={limit}", timeout=API_TIMEOUT)
+    resp.raise_for_status()
+    return orjson.loads(resp.content)
+
+
+def clear_backend_cache(base_url: str) -> None:
+    """Ask the API to drop its cached BigQuery results (best effort)."""
+    try:
+        get_session().post(f"{base_url}/refresh", timeout=API_TIMEOUT).raise_for_status()
+    except Exception as e:
+        st.warning(f"Could not refresh the API cache: {e}")
+
+
 def main() -> None:
     st.title("Real-time Weather Dashboard")
     st.caption("Forecasting weather in FPT Plaza 2, Danang")
@@ -47,103 +93,108 @@ def main() -> None:
                 st.code(f"Timeout: {API_TIMEOUT}s")
                 st.caption(f"Config source: {config_source}")
 
+    with st.sidebar:
+        if st.button("🔄 Refresh"):
+            fetch_predict.clear()
+            fetch_rows.clear()
+            clear_backend_cache(API_BASE_URL)
+            st.session_state.pop("prediction", None)
+            st.session_state.pop("trends_df", None)
+
     st.subheader("Latest Weather & Prediction")
 
     if st.button("Get latest prediction"):
         # --- Call prediction API ---
         try:
-            resp = requests.get(f"{API_BASE_URL}/predict", timeout=API_TIMEOUT)
+            st.session_state["prediction"] = fetch_predict(API_BASE_URL)
+        except requests.HTTPError as e:
+            # Drop the previous payload so stale tiles don't show under the error
+            st.session_state.pop("prediction", None)
+            st.error(f"Prediction API error (HTTP {e.response.status_code}): {e.response.text}")
         except Exception as e:
+            st.session_state.pop("prediction", None)
             st.error(f"Failed to call prediction API: {e}")
-            return
-
-        if not resp.ok:
-            st.error(f"Prediction API error (HTTP {resp.status_code}): {resp.text}")
-            return
-
-        data = resp.json()
 
+    # Kept in session state so the tiles survive reruns (e.g. loading trends)
+    data = st.session_state.get("prediction")
+    if data is not None:
         if data.get("status") != "success":
             st.warning(data.get("message", "Prediction API returned an error status."))
-            return
-
-        current = data.get("current_weather", {}).get("temp")
-        forecast = data.get("forecast_next")
-
-        col1, col2 = st.columns(2)
-        col1.metric("Current Temperature (°C)", f"{current:.2f}" if current is not None else "N/A")
-        col2.metric("Predicted Next Temperature (°C)", f"{forecast:.2f}" if forecast is not None else "N/A")
-
-        # --- After prediction, refresh latest raw data from BigQuery via /data ---
-        st.markdown("#### Latest Weather Readings (refreshed)")
-        try:
-            data_resp = requests.get(f"{API_BASE_URL}/data?limit=500", timeout=API_TIMEOUT)
-            if not data_resp.ok:
-                st.error(f"Data API error (HTTP {data_resp.status_code}): {data_resp.text}")
-            else:
-                data_json = data_resp.json()
-                if data_json.get("status") != "success":
-                    st.warning(data_json.get("message", "Data API returned an error status."))
-                else:
-                    rows = data_json.get("rows", [])
-                    if rows:
-                        df = pd.DataFrame(rows)
-                        
-                        # Convert timestamp to datetime if it exists
-                        if 'timestamp' in df.columns:
-                            df['timestamp'] = pd.to_datetime(df['timestamp'])
-                            df = df.sort_values('timestamp')
-                        
-                        # Display latest data table
-                        st.dataframe(df.tail(10), use_container_width=True)
-                        
-                        # --- Charts Section ---
-                        st.markdown("#### Weather Trends")
-                        
-                        # Temperature chart
-                        if 'temperature' in df.columns:
-                            st.markdown("**Temperature Over Time**")
-                            temp_df = df[['timestamp', 'temperature']].copy() if 'timestamp' in df.columns else df[['temperature']].copy()
-                            temp_df = temp_df.set_index('timestamp') if 'timestamp' in df.columns else temp_df.set_index(temp_df.index)
-                            st.line_chart(temp_df, use_container_width=True)
-                        
-                        # Multi-metric chart
-                        chart_cols = []
-                        if 'temperature' in df.columns:
-                            chart_cols.append('temperature')
-                        if 'humidity' in df.columns:
-                            chart_cols.append('humidity')
-                        if 'wind_speed' in df.columns:
-                            chart_cols.append('wind_speed')
-                        
-                        if len(chart_cols) > 1:
-                            st.markdown("**Temperature, Humidity & Wind Speed**")
-                            multi_df = df[['timestamp'] + chart_cols].copy() if 'timestamp' in df.columns else df[chart_cols].copy()
-                            multi_df = multi_df.set_index('timestamp') if 'timestamp' in df.columns else multi_df.set_index(multi_df.index)
-                            st.line_chart(multi_df, use_container_width=True)
-                        
-                        # Individual charts in columns
-                        if len(chart_cols) >= 2:
-                            col1, col2 = st.columns(2)
-                            
-                            with col1:
-                                if 'humidity' in df.columns:
-                                    st.markdown("**Humidity Over Time**")
-                                    humidity_df = df[['timestamp', 'humidity']].copy() if 'timestamp' in df.columns else df[['humidity']].copy()
-                                    humidity_df = humidity_df.set_index('timestamp') if 'timestamp' in df.columns else humidity_df.set_index(humidity_df.index)
-                                    st.area_chart(humidity_df, use_container_width=True)
-                            
-                            with col2:
-                                if 'wind_speed' in df.columns:
-                                    st.markdown("**Wind Speed Over Time**")
-                                    wind_df = df[['timestamp', 'wind_speed']].copy() if 'timestamp' in df.columns else df[['wind_speed']].copy()
-                                    wind_df = wind_df.set_index('timestamp') if 'timestamp' in df.columns else wind_df.set_index(wind_df.index)
-                                    st.area_chart(wind_df, use_container_width=True)
-                    else:
-                        st.info("No rows returned from data API.")
-        except Exception as e:
-            st.error(f"Failed to call data API: {e}")
-
+        else:
+            current = data.get("current_weather", {}).get("temp")
+            forecast = data.get("forecast_next")
+
+            col1, col2 = st.columns(2)
+            col1.metric("Current Temperature (°C)", f"{current:.2f}" if current is not None else "N/A")
+            col2.metric("Predicted Next Temperature (°C)", f"{forecast:.2f}" if forecast is not None else "N/A")
+
+    # --- Latest raw data from BigQuery via /data, only fetched on demand ---
+    with st.expander("Weather trends (load on demand)"):
+        if st.button("Load trends", key="load_trends"):
+            load_trends()
+
+        df = st.session_state.get("trends_df")
+        if df is not None:
+            render_trends(df)
+
+
+def load_trends() -> None:
+    """Fetch recent rows from /data and keep them in session state."""
+    try:
+        data_json = fetch_rows(API_BASE_URL, 500)
+    except requests.HTTPError as e:
+        st.error(f"Data API error (HTTP {e.response.status_code}): {e.response.text}")
+        return
+    except Exception as e:
+        st.error(f"Failed to call data API: {e}")
+        return
+
+    if data_json.get("status") != "success":
+        st.warning(data_json.get("message", "Data API returned an error status."))
+        return
+
+    rows = data_json.get("rows", [])
+    if not rows:
+        st.info("No rows returned from data API.")
+        return
+
+    # Known schema: skip per-row dict key inference
+    df = pd.DataFrame.from_records(rows, columns=DATA_COLUMNS)
+    
+    # Convert timestamp to datetime (ISO 8601 strings from the API)
+    df['timestamp'] = pd.to_datetime(df['timestamp'], format="ISO8601", cache=True)
+    st.session_state["trends_df"] = df.sort_values('timestamp', kind="stable")
+
+
+def render_trends(df: pd.DataFrame) -> None:
+    """Show the latest readings table and the weather trend charts."""
+    st.markdown("#### Latest Weather Readings")
+    st.dataframe(df.tail(10), use_container_width=True)
+    
+    # --- Charts Section ---
+    st.markdown("#### Weather Trends")
+    
+    # Index by time once; every chart below is a column view of this frame
+    plot_df = df.set_index('timestamp')
+    
+    # Temperature chart
+    st.markdown("**Temperature Over Time**")
+    st.line_chart(plot_df[['temperature']], use_container_width=True)
+    
+    # Multi-metric chart
+    st.markdown("**Temperature, Humidity & Wind Speed**")
+    st.line_chart(plot_df, use_container_width=True)
+    
+    # Individual charts in columns
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.markdown("**Humidity Over Time**")
+        st.area_chart(plot_df[['humidity']], use_container_width=True)
+    
+    with col2:
+        st.markdown("**Wind Speed Over Time**")
+        st.area_chart(plot_df[['wind_speed']], use_container_width=True)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,43 @@
+import orjson
+
+from config_loader import Config
+
+
+def _write_config(tmp_path, data):
+    path = tmp_path / "config.json"
+    path.write_bytes(orjson.dumps(data))
+    return Config(str(path))
+
+
+def test_deep_merge_nested_override_keeps_defaults(tmp_path):
+    base = {"a": {"b": {"c": 1, "d": 2}, "e": 3}, "f": 4}
+    override = {"a": {"b": {"c": 10}, "g": 5}, "f": {"h": 6}}
+
+    merged = Config(str(tmp_path / "config.json"))._deep_merge(base, override)
+
+    assert merged is base
+    assert merged == {"a": {"b": {"c": 10, "d": 2}, "e": 3, "g": 5}, "f": {"h": 6}}
+
+
+def test_file_config_merges_over_defaults(tmp_path, monkeypatch):
+    monkeypatch.delenv("BIGQUERY_TABLE", raising=False)
+    monkeypatch.delenv("GCP_PROJECT_ID", raising=False)
+    config = _write_config(tmp_path, {"gcp": {"table_id": "custom"}, "app": {"show_debug_info": True}})
+
+    assert config.get("gcp", "table_id") == "custom"
+    # Sibling keys of an overridden section fall back to the defaults
+    assert config.get("gcp", "project_id") == "ai-realtime-project"
+    assert config.get("app", "show_debug_info") is True
+    assert config.get("model", "model_file") == "weather_model.npy"
+
+
+def test_env_overrides_win_over_file_and_convert_types(tmp_path, monkeypatch):
+    monkeypatch.setenv("BIGQUERY_TABLE", "from-env")
+    monkeypatch.setenv("WEATHER_LAT", "10.5")
+    monkeypatch.setenv("WEATHER_CITY", "")  # empty values are ignored
+    config = _write_config(tmp_path, {"gcp": {"table_id": "from-file"}, "weather": {"city": "Hue"}})
+
+    assert config.get("gcp", "table_id") == "from-env"
+    assert config.weather_latitude == 10.5
+    assert config.weather_city == "Hue"
+    assert config.gcp_full_table_path == "ai-realtime-project.sensor_data_stream.from-env"
@@ -0,0 +1,54 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+import predict_only as po
+
+
+def test_engineer_features_time_columns_match_pandas():
+    timestamps = pd.date_range("2023-12-29 18:00", periods=200, freq="37min", tz="UTC")
+    df = pd.DataFrame({
+        "timestamp": timestamps,
+        "temperature": np.linspace(25, 30, len(timestamps)),
+        "humidity": 70.0,
+        "wind_speed": 3.0,
+    })
+
+    df_feat, df_clean = po.engineer_features(df)
+
+    np.testing.assert_array_equal(df_feat["hour"], timestamps.hour)
+    np.testing.assert_array_equal(df_feat["day_of_week"], timestamps.dayofweek)
+    assert len(df_clean) == len(timestamps) - 1
+    np.testing.assert_array_equal(
+        df_clean["target_temp"], df["temperature"].to_numpy()[1:]
+    )
+
+
+def test_concurrent_cache_misses_run_one_query(monkeypatch):
+    calls = []
+
+    class FakeJob:
+        def to_arrow(self, **kwargs):
+            time.sleep(0.2)  # keep the query in flight while the other threads miss
+            return pa.table({"temperature": [21.5]})
+
+    class FakeClient:
+        def query(self, *args, **kwargs):
+            calls.append(1)
+            return FakeJob()
+
+    monkeypatch.setattr(po, "_BQ_CLIENT", FakeClient())
+    po.clear_cache()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        frames = list(pool.map(lambda _: po.load_latest_data(123), range(8)))
+
+    assert len(calls) == 1
+    assert all(df["temperature"].iat[0] == 21.5 for df in frames)
+
+    po.clear_cache()
+    po.load_latest_data(123)
+    assert len(calls) == 2
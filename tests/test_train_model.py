@@ -0,0 +1,192 @@
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+import train_model as tm
+
+
+def _sample(n=2_000, seed=0):
+    rng = np.random.default_rng(seed)
+    temp = rng.uniform(20, 35, n).astype(np.float32)
+    hour = rng.integers(0, 24, n).astype(np.float32)
+    hum = rng.uniform(40, 95, n).astype(np.float32)
+    target = (0.9 * temp + 0.05 * hour - 0.02 * hum + 2.0 + rng.normal(0, 0.1, n)).astype(np.float32)
+    return temp, hour, hum, target
+
+
+def _reference_beta(temp, hour, hum, target):
+    X1 = np.column_stack([np.ones(len(target)), temp, hour, hum]).astype(np.float64)
+    return np.linalg.lstsq(X1, target.astype(np.float64), rcond=None)[0]
+
+
+def test_numpy_normal_equations_match_lstsq():
+    data = _sample()
+    beta = tm.solve_normal_equations(*tm._normal_equations_numpy(*data))
+    np.testing.assert_allclose(beta, _reference_beta(*data), rtol=1e-4, atol=1e-4)
+
+
+def test_numba_kernel_matches_numpy():
+    if tm.njit is None:
+        pytest.skip("numba not installed")
+    data = _sample()
+    XtX, Xty = tm._normal_equations_kernel(*data)
+    XtX_np, Xty_np = tm._normal_equations_numpy(*data)
+    np.testing.assert_allclose(XtX, XtX_np, rtol=1e-9)
+    np.testing.assert_allclose(Xty, Xty_np, rtol=1e-9)
+
+
+def test_batched_partials_sum_to_single_batch():
+    data = _sample()
+    XtX, Xty = tm.build_normal_equations(*data)
+
+    XtX_sum = np.zeros((4, 4))
+    Xty_sum = np.zeros(4)
+    for start in range(0, len(data[0]), 300):
+        part_XtX, part_Xty = tm.build_normal_equations(*(a[start:start + 300] for a in data))
+        XtX_sum += part_XtX
+        Xty_sum += part_Xty
+
+    np.testing.assert_allclose(XtX_sum, XtX, rtol=1e-9)
+    np.testing.assert_allclose(Xty_sum, Xty, rtol=1e-9)
+
+
+def test_fit_linreg_matches_lstsq():
+    temp, hour, hum, target = _sample()
+    X = np.column_stack([temp, hour, hum])
+    model = tm.LinearModel(tm.fit_linreg(X, target))
+
+    reference = _reference_beta(temp, hour, hum, target)
+    np.testing.assert_allclose(model.beta, reference, rtol=1e-4, atol=1e-4)
+    np.testing.assert_allclose(
+        model.predict(X[:5]), X[:5] @ reference[1:] + reference[0], rtol=1e-4
+    )
+
+
+def _training_table(n=5):
+    return pa.table({
+        "timestamp": pa.array(range(n), pa.int64()),
+        "temperature": pa.array(np.linspace(25, 26, n)),
+        "humidity": pa.array([70.0] * n),
+        "wind_speed": pa.array([3.0] * n),
+        "hour": pa.array(range(n), pa.int64()),
+        "day_of_week": pa.array([1] * n, pa.int64()),
+        "target_temp": pa.array(np.linspace(25.2, 26.2, n)),
+    })
+
+
+def test_snapshot_round_trip_projects_training_columns(tmp_path, monkeypatch):
+    monkeypatch.setattr(tm, "SNAPSHOT_DIR", str(tmp_path / "cache"))
+    query = tm._training_query(5)
+
+    assert tm._read_snapshot(query) is None
+    tm._write_snapshot(query, _training_table())
+
+    table = tm._read_snapshot(query)
+    assert table.column_names == tm.TRAINING_COLUMNS
+    assert table.num_rows == 5
+    # Only the finished snapshot is left behind, and another query has its own key
+    assert os.listdir(tm.SNAPSHOT_DIR) == [os.path.basename(tm._snapshot_path(query))]
+    assert tm._snapshot_path(tm._training_query(6)) != tm._snapshot_path(query)
+
+
+def test_stale_or_corrupt_snapshot_is_a_miss(tmp_path, monkeypatch):
+    monkeypatch.setattr(tm, "SNAPSHOT_DIR", str(tmp_path))
+    query = tm._training_query(5)
+    tm._write_snapshot(query, _training_table())
+    path = tm._snapshot_path(query)
+
+    old = time.time() - tm.SNAPSHOT_MAX_AGE - 1
+    os.utime(path, (old, old))
+    assert tm._read_snapshot(query) is None
+
+    with open(path, "wb") as f:
+        f.write(b"not parquet")
+    assert tm._read_snapshot(query) is None
+
+
+def test_snapshot_write_errors_are_not_fatal(tmp_path, monkeypatch):
+    monkeypatch.setattr(tm, "SNAPSHOT_DIR", str(tmp_path))
+
+    def fail(*args, **kwargs):
+        raise pa.ArrowInvalid("boom")
+
+    monkeypatch.setattr(tm.pq, "write_table", fail)
+    tm._write_snapshot(tm._training_query(5), _training_table())
+    assert os.listdir(tmp_path) == []
+
+
+def test_streaming_and_batch_paths_train_on_the_same_rows(tmp_path, monkeypatch):
+    table = _training_table(50)
+    # Nulls in a model column and in a column training never reads
+    table = table.set_column(1, "temperature", pa.array([None] + list(np.linspace(25, 26, 49))))
+    table = table.set_column(3, "wind_speed", pa.array([3.0] * 49 + [None]))
+
+    class FakeRows:
+        def to_arrow(self, **kwargs):
+            return table
+
+        def to_arrow_iterable(self, **kwargs):
+            return iter(table.to_batches(max_chunksize=7))
+
+    class FakeClient:
+        def query(self, query):
+            return type("Job", (), {"result": lambda self, **kwargs: FakeRows()})()
+
+    monkeypatch.setattr(tm, "get_bq_client", lambda: FakeClient())
+    monkeypatch.setattr(tm.bigquery_storage, "BigQueryReadClient", lambda: None)
+    monkeypatch.setattr(tm, "SNAPSHOT_DIR", str(tmp_path))
+
+    df, df_clean = tm._load_and_prepare(50)
+    batch_model = tm.train_model(df, df_clean, str(tmp_path / "batch.npy"))
+    streamed_model = tm.train_model_streaming(50, str(tmp_path / "streamed.npy"))
+
+    assert len(df_clean) == 49
+    np.testing.assert_allclose(streamed_model.beta, batch_model.beta, rtol=1e-5)
+
+
+def test_save_and_load_model_round_trip(tmp_path):
+    model = tm.LinearModel(np.array([4.0, 1.0, 2.0, 3.0], dtype=np.float32))
+
+    # np.save must not append ".npy" to a path that lacks it
+    for path in (tmp_path / "weather_model.npy", tmp_path / "custom_model"):
+        tm.save_model(model, str(path))
+        assert os.listdir(tmp_path).count(path.name) == 1
+        loaded = tm.load_model(str(path))
+        np.testing.assert_array_equal(loaded.beta, model.beta)
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+    # A retrain (new mtime) replaces the cached model
+    path = str(tmp_path / "weather_model.npy")
+    tm.save_model(tm.LinearModel(np.zeros(4, dtype=np.float32)), path)
+    os.utime(path, (time.time() + 5, time.time() + 5))
+    np.testing.assert_array_equal(tm.load_model(path).beta, np.zeros(4))
+
+
+@pytest.mark.filterwarnings("ignore:Trying to unpickle estimator")
+def test_legacy_sklearn_pickle_is_converted(tmp_path):
+    joblib = pytest.importorskip("joblib")
+    pytest.importorskip("sklearn")
+    legacy = joblib.load(os.path.join(tm.CURRENT_DIR, "weather_model.pkl"))
+    shutil.copy(os.path.join(tm.CURRENT_DIR, "weather_model.pkl"), tmp_path)
+
+    # No .npy yet: load_model falls back to the pickle next to it
+    model = tm.load_model(str(tmp_path / "weather_model.npy"))
+
+    assert isinstance(model, tm.LinearModel)
+    X = np.array([[28.5, 14, 75.0], [24.0, 3, 90.0]], dtype=np.float32)
+    expected = legacy.predict(pd.DataFrame(X, columns=legacy.feature_names_in_))
+    np.testing.assert_allclose(model.predict(X), expected, rtol=1e-5)
+
+
+def test_legacy_coefficient_pickle_is_loaded(tmp_path):
+    joblib = pytest.importorskip("joblib")
+    beta = np.array([4.0, 1.0, 2.0, 3.0], dtype=np.float32)
+    joblib.dump(beta, tmp_path / "weather_model.pkl")
+
+    model = tm.load_model(str(tmp_path / "weather_model.npy"))
+    np.testing.assert_array_equal(model.beta, beta)
@@ -1,15 +1,31 @@
+import argparse
+import hashlib
 import os
-from typing import Optional
+import tempfile
+import time
+from functools import lru_cache
+from typing import Optional, Tuple
 
-import joblib
+import numpy as np
 import pandas as pd
-from google.cloud import bigquery
-from sklearn.linear_model import LinearRegression
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from google.cloud import bigquery, bigquery_storage
+
+try:
+    from numba import njit, prange
+except ImportError:  # numba is optional; the numpy path is used instead
+    njit = None
+    prange = range
 
 
 # --- FILE & MODEL CONFIG ---
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
-MODEL_PATH = os.path.join(CURRENT_DIR, "weather_model.pkl")
+# Coefficients [intercept, temperature, hour, humidity] saved with np.save.
+# Older versions pickled the model to weather_model.pkl, which is still loaded
+# as long as no .npy file exists.
+MODEL_PATH = os.path.join(CURRENT_DIR, "weather_model.npy")
 KEY_FILE = os.path.join(CURRENT_DIR, "ai-realtime-project-4de709b969f4.json")
 os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = KEY_FILE
 
@@ -20,10 +36,159 @@ DATASET_ID = "sensor_data_stream"
 TABLE_ID = "real-weather"
 FULL_TABLE_PATH = f"{PROJECT_ID}.{DATASET_ID}.{TABLE_ID}"
 
+# Measurements are downcast to float32 as they are downloaded: half the bytes
+# for every pass over the training frame, and the model trains in float32 anyway.
+# hour/day_of_week arrive as INT64 from SQL and are stored as int8, the same
+# representation predict_only.engineer_features produces at inference time.
+TRAINING_DTYPES = {
+    "temperature": "float32",
+    "humidity": "float32",
+    "wind_speed": "float32",
+    "target_temp": "float32",
+    "hour": "int8",
+    "day_of_week": "int8",
+}
+
+# Columns training reads from the query result: model features + target
+TRAINING_COLUMNS = ["temperature", "hour", "humidity", "target_temp"]
+
+# Local Parquet snapshot of the training query, reused while iterating on the model
+# (kept in a per-user cache directory, not the shared temp dir)
+SNAPSHOT_DIR = os.path.join(
+    os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "weather-forecast",
+)
+SNAPSHOT_MAX_AGE = 600  # seconds
+
+# Larger training runs are reduced batch by batch instead of loaded into pandas
+STREAMING_MIN_ROWS = 100_000
+
+
+@lru_cache(maxsize=1)
+def get_bq_client() -> bigquery.Client:
+    """Return a BigQuery client, created once and reused for later queries."""
+    return bigquery.Client()
+
+
+def _normal_equations_numpy(temp, hour, hum, target) -> Tuple[np.ndarray, np.ndarray]:
+    """Accumulate X^T X and X^T y for X = [1, temp, hour, hum] with numpy."""
+    X1 = np.empty((len(target), 4), dtype=np.float64)
+    X1[:, 0] = 1.0
+    X1[:, 1] = temp
+    X1[:, 2] = hour
+    X1[:, 3] = hum
+    return X1.T @ X1, X1.T @ np.asarray(target, dtype=np.float64)
+
 
-def train_model(df: pd.DataFrame, df_clean: pd.DataFrame, model_path: str = MODEL_PATH) -> Optional[LinearRegression]:
+def _normal_equations_loop(temp, hour, hum, target):
+    """Same as _normal_equations_numpy as a single fused loop (compiled by numba)."""
+    n = 0.0
+    s_t = s_h = s_u = 0.0
+    s_tt = s_th = s_tu = s_hh = s_hu = s_uu = 0.0
+    s_y = s_ty = s_hy = s_uy = 0.0
+    for i in prange(len(target)):
+        t = np.float64(temp[i])
+        h = np.float64(hour[i])
+        u = np.float64(hum[i])
+        y = np.float64(target[i])
+        n += 1.0
+        s_t += t
+        s_h += h
+        s_u += u
+        s_tt += t * t
+        s_th += t * h
+        s_tu += t * u
+        s_hh += h * h
+        s_hu += h * u
+        s_uu += u * u
+        s_y += y
+        s_ty += t * y
+        s_hy += h * y
+        s_uy += u * y
+
+    XtX = np.empty((4, 4), dtype=np.float64)
+    XtX[0, 0] = n
+    XtX[0, 1] = XtX[1, 0] = s_t
+    XtX[0, 2] = XtX[2, 0] = s_h
+    XtX[0, 3] = XtX[3, 0] = s_u
+    XtX[1, 1] = s_tt
+    XtX[1, 2] = XtX[2, 1] = s_th
+    XtX[1, 3] = XtX[3, 1] = s_tu
+    XtX[2, 2] = s_hh
+    XtX[2, 3] = XtX[3, 2] = s_hu
+    XtX[3, 3] = s_uu
+    Xty = np.empty(4, dtype=np.float64)
+    Xty[0] = s_y
+    Xty[1] = s_ty
+    Xty[2] = s_hy
+    Xty[3] = s_uy
+    return XtX, Xty
+
+
+if njit is not None:
+    _normal_equations_kernel = njit(cache=True, fastmath=True, parallel=True)(_normal_equations_loop)
+else:
+    _normal_equations_kernel = _normal_equations_numpy
+
+
+def build_normal_equations(temp, hour, hum, target) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return (X^T X, X^T y) for the model features [1, temperature, hour, humidity].
+
+    Uses a numba-compiled fused loop when numba is installed, so large training
+    sets are reduced in one pass without building the design matrix. Partial
+    results from separate batches can simply be summed.
     """
-    Train a LinearRegression model on the weather data and save it to disk.
+    return _normal_equations_kernel(
+        np.ascontiguousarray(temp, dtype=np.float32),
+        np.ascontiguousarray(hour, dtype=np.float32),
+        np.ascontiguousarray(hum, dtype=np.float32),
+        np.ascontiguousarray(target, dtype=np.float32),
+    )
+
+
+def solve_normal_equations(XtX: np.ndarray, Xty: np.ndarray) -> np.ndarray:
+    """Solve for beta = [intercept, coef_1, ..., coef_k] and return it as float32."""
+    try:
+        beta = np.linalg.solve(XtX, Xty)
+    except np.linalg.LinAlgError:
+        # Degenerate data (e.g. a constant feature): fall back to least squares
+        beta = np.linalg.lstsq(XtX, Xty, rcond=None)[0]
+    return beta.astype(np.float32)
+
+
+def fit_linreg(X: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """
+    Fit ordinary least squares with an intercept via the normal equations.
+
+    X holds the columns temperature, hour, humidity. Returns beta as float32.
+    With only a few features the 4x4 solve is much cheaper than an SVD-based
+    lstsq; sums are accumulated in float64 to keep the solve well-conditioned.
+    """
+    return solve_normal_equations(*build_normal_equations(X[:, 0], X[:, 1], X[:, 2], y))
+
+
+class LinearModel:
+    """Linear regression coefficients with a scikit-learn style predict()."""
+
+    def __init__(self, beta: np.ndarray):
+        self.beta = beta
+
+    @property
+    def intercept_(self) -> float:
+        return float(self.beta[0])
+
+    @property
+    def coef_(self) -> np.ndarray:
+        return self.beta[1:]
+
+    def predict(self, X) -> np.ndarray:
+        return np.asarray(X, dtype=np.float32) @ self.beta[1:] + self.beta[0]
+
+
+def train_model(df: pd.DataFrame, df_clean: pd.DataFrame, model_path: str = MODEL_PATH) -> Optional[LinearModel]:
+    """
+    Train a linear regression model on the weather data and save it to disk.
 
     Expects:
       - df: full dataframe with latest row (including engineered features).
@@ -32,55 +197,205 @@ def train_model(df: pd.DataFrame, df_clean: pd.DataFrame, model_path: str = MODE
     if len(df_clean) <= 2:
         return None
 
-    X = df_clean[["temperature", "hour", "humidity"]]
-    y = df_clean["target_temp"]
-
-    model = LinearRegression()
-    model.fit(X, y)
+    X = df_clean[["temperature", "hour", "humidity"]].to_numpy(dtype=np.float32)
+    y = df_clean["target_temp"].to_numpy(dtype=np.float32)
 
-    joblib.dump(model, model_path)
+    model = LinearModel(fit_linreg(X, y))
+    save_model(model, model_path)
     return model
 
 
-def load_model(model_path: str = MODEL_PATH) -> Optional[LinearRegression]:
-    """Load a previously trained model from disk, if it exists."""
-    if not os.path.exists(model_path):
+def save_model(model: LinearModel, model_path: str = MODEL_PATH) -> None:
+    """Persist the model coefficients as a raw float32 .npy array (written atomically)."""
+    # Write through a file object so np.save keeps the exact path (no added
+    # ".npy"), and swap it in with os.replace so readers never see a partial file
+    tmp = f"{model_path}.tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, model.beta.astype(np.float32))
+    os.replace(tmp, model_path)
+    _load_model_file.cache_clear()
+
+
+@lru_cache(maxsize=4)
+def _load_model_file(model_path: str, mtime: float):
+    """Read a model file; cached per (path, mtime) so rewrites are reloaded."""
+    with open(model_path, "rb") as f:
+        if f.read(6) == b"\x93NUMPY":  # .npy magic, whatever the file is named
+            f.seek(0)
+            return LinearModel(np.load(f))
+    # Legacy pickle: only import joblib (and sklearn via unpickling) when needed
+    import joblib
+    saved = joblib.load(model_path)
+    if isinstance(saved, np.ndarray):
+        return LinearModel(saved)
+    # Fitted scikit-learn estimator from the oldest versions: keep its coefficients
+    return LinearModel(np.r_[saved.intercept_, saved.coef_].astype(np.float32))
+
+
+def load_model(model_path: str = MODEL_PATH) -> Optional[LinearModel]:
+    """
+    Load a previously trained model from disk, if it exists.
+
+    Falls back to the legacy pickled model when no coefficient file exists yet.
+    The loaded model is kept in memory and only reloaded when the file's
+    modification time changes (e.g. after a nightly retrain).
+    """
+    legacy_path = os.path.splitext(model_path)[0] + ".pkl"
+    for path in (model_path, legacy_path):
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            continue
+        return _load_model_file(path, mtime)
+    return None
+
+
+def _training_query(limit: int) -> str:
+    """SQL returning the newest `limit` rows in timestamp order, with model features computed in BigQuery."""
+    # Feature engineering runs in BigQuery (same features as the notebook/Streamlit app):
+    #   hour, day_of_week (Monday=0, like pandas) and target_temp = next temperature.
+    # LEAD runs over the limited rows so the last row has no target, as before.
+    return f"""
+        SELECT
+            timestamp, temperature, humidity, wind_speed,
+            CAST(EXTRACT(HOUR FROM timestamp) AS INT64) AS hour,
+            MOD(EXTRACT(DAYOFWEEK FROM timestamp) + 5, 7) AS day_of_week,
+            LEAD(temperature) OVER (ORDER BY timestamp) AS target_temp
+        FROM (
+            SELECT timestamp, temperature, humidity, wind_speed
+            FROM `{FULL_TABLE_PATH}`
+            ORDER BY timestamp DESC
+            LIMIT {limit}
+        )
+        ORDER BY timestamp ASC
+    """
+
+
+def _complete_rows(columns) -> pa.Array:
+    """Boolean mask of the rows where every one of `columns` is non-null."""
+    complete = pc.is_valid(columns[0])
+    for column in columns[1:]:
+        complete = pc.and_(complete, pc.is_valid(column))
+    return complete
+
+
+def _snapshot_path(query: str) -> str:
+    """Snapshot file for `query`; the name hashes the SQL so edits never reuse stale data."""
+    digest = hashlib.sha256(query.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(SNAPSHOT_DIR, f"training_{digest}.parquet")
+
+
+def _read_snapshot(query: str) -> Optional[pa.Table]:
+    """Return the cached result of `query` if a fresh, readable snapshot exists."""
+    snapshot = _snapshot_path(query)
+    try:
+        if time.time() - os.path.getmtime(snapshot) >= SNAPSHOT_MAX_AGE:
+            return None
+        return pq.read_table(snapshot, columns=TRAINING_COLUMNS)
+    except Exception:
+        # Missing, truncated or otherwise unreadable: query BigQuery instead
         return None
-    return joblib.load(model_path)
 
 
-def _engineer_features(df: pd.DataFrame) -> pd.DataFrame:
-    """Apply the same feature engineering used in the notebook/Streamlit app."""
-    df = df.copy()
-    df["timestamp"] = pd.to_datetime(df["timestamp"])
-    df["hour"] = df["timestamp"].dt.hour
-    df["day_of_week"] = df["timestamp"].dt.dayofweek
-    df["target_temp"] = df["temperature"].shift(-1)
-    return df
+def _write_snapshot(query: str, table: pa.Table) -> None:
+    """Atomically write `table` as the snapshot for `query` (best effort)."""
+    try:
+        os.makedirs(SNAPSHOT_DIR, mode=0o700, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=SNAPSHOT_DIR, suffix=".parquet.tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pq.write_table(table, f, compression="zstd")
+            os.replace(tmp, _snapshot_path(query))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    except Exception as e:
+        print(f"⚠️ Could not write training snapshot: {e}")
 
 
 def _load_and_prepare(limit: int = 1000) -> tuple[pd.DataFrame, pd.DataFrame]:
-    """Load data from BigQuery and return (df_with_features, df_clean)."""
-    client = bigquery.Client()
+    """
+    Load data from BigQuery and return (df_with_features, df_clean).
 
-    query = f"""
-        SELECT timestamp, temperature, humidity, wind_speed
-        FROM `{FULL_TABLE_PATH}`
-        ORDER BY timestamp ASC
-        LIMIT {limit}
+    The query result is also written to a local Parquet snapshot; runs within
+    SNAPSHOT_MAX_AGE seconds read the snapshot instead of querying BigQuery.
+    Only TRAINING_COLUMNS are loaded either way.
     """
-    df = client.query(query).to_arrow().to_pandas()
+    query = _training_query(limit)
+    table = _read_snapshot(query)
+    if table is None:
+        # Download via the BigQuery Storage Read API (Arrow over gRPC) when available
+        job = get_bq_client().query(query)
+        table = job.result().to_arrow(create_bqstorage_client=True)
+        _write_snapshot(query, table)
+        table = table.select(TRAINING_COLUMNS)
+
+    # Downcast and drop incomplete rows with Arrow kernels before converting to pandas
+    schema = pa.schema(
+        field.with_type(pa.type_for_alias(TRAINING_DTYPES[field.name]))
+        if field.name in TRAINING_DTYPES else field
+        for field in table.schema
+    )
+    table = table.cast(schema)
+    df = table.to_pandas(split_blocks=True)
     if df.empty:
         return df, df
 
-    df_feat = _engineer_features(df)
-    df_clean = df_feat.dropna().copy()
-    return df_feat, df_clean
+    df_clean = table.filter(_complete_rows(table.columns)).to_pandas(split_blocks=True)
+    return df, df_clean
+
+
+def train_model_streaming(
+    limit: int, model_path: str = MODEL_PATH, page_size: int = 10_000
+) -> Optional[LinearModel]:
+    """
+    Train on a large query result without materializing it as one DataFrame.
+
+    Record batches are reduced into X^T X / X^T y as they arrive, so peak memory
+    is bounded by a single page regardless of `limit`.
+    """
+    rows = get_bq_client().query(_training_query(limit)).result(page_size=page_size)
+
+    XtX = np.zeros((4, 4), dtype=np.float64)
+    Xty = np.zeros(4, dtype=np.float64)
+    n_rows = 0
+    # Batches arrive as Arrow over gRPC from the Storage Read API, not REST pages
+    for batch in rows.to_arrow_iterable(bqstorage_client=bigquery_storage.BigQueryReadClient()):
+        # Same columns and completeness rule as _load_and_prepare
+        columns = [batch.column(name) for name in TRAINING_COLUMNS]
+        complete = _complete_rows(columns)
+        temp, hour, hum, target = (
+            pc.filter(column, complete).to_numpy(zero_copy_only=False) for column in columns
+        )
+        batch_XtX, batch_Xty = build_normal_equations(temp, hour, hum, target)
+        XtX += batch_XtX
+        Xty += batch_Xty
+        n_rows += len(target)
+
+    if n_rows <= 2:
+        return None
+
+    model = LinearModel(solve_normal_equations(XtX, Xty))
+    save_model(model, model_path)
+    return model
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the next-temperature model from BigQuery data.")
+    parser.add_argument("--limit", type=int, default=1000, help="Number of recent rows to train on.")
+    args = parser.parse_args()
+
+    if args.limit >= STREAMING_MIN_ROWS:
+        print(f"📡 Streaming {args.limit} rows from BigQuery...")
+        model = train_model_streaming(args.limit)
+        if model is None:
+            print("⚠️ Not enough data to train a model (need > 2 rows with target).")
+        else:
+            print(f"🎉 Model trained and saved to: {MODEL_PATH}")
+        raise SystemExit(0)
+
     print("📡 Loading data from BigQuery...")
-    df_feat, df_clean = _load_and_prepare()
+    df_feat, df_clean = _load_and_prepare(args.limit)
 
     if df_feat.empty:
         print("⚠️ No data found in BigQuery table. Start your `real-weather.py` streamer first.")